@@ -1,59 +1,92 @@
 # dinein_agent_system.py
 
+import functools
 import json
-import os
-from typing import List, Optional
-from datetime import datetime, timedelta
+import re
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from datetime import date as Date, datetime
 import random
+import itertools
+from collections import OrderedDict, defaultdict
+import threading
 
 try:
-    from dotenv import load_dotenv
-    from pydantic import BaseModel
-    import boto3
+    from pydantic import ValidationError
+    import numpy as np
 except ImportError as e:
     print("\n🔧 Required packages not found. Please install dependencies with:")
-    print("pip install boto3 python-dotenv pydantic")
+    print("pip install boto3 python-dotenv pydantic numpy")
     raise e
 
-# Load environment variables
-load_dotenv()
-
-# ---------- Context Models ----------
-class GuestProfile(BaseModel):
-    guest_id: str
-    name: str
-    loyalty_status: str
-    preferences: List[str]
-    visit_history: List[str]
-
-class ReservationRequest(BaseModel):
-    guest_id: str
-    party_size: int
-    date: str
-    time: str
-    channel: str  # web, phone, kiosk, app
-    table_type: Optional[str] = "any"
-
-class Table(BaseModel):
-    table_id: str
-    seats: int
-    type: str  # window, booth, bar, etc.
-    is_available: bool = True
-    reserved_slots: List[str] = []
-
-class ReservationStatus(BaseModel):
-    reservation_id: str
-    guest_id: str
-    table_id: Optional[str]
-    status: str  # confirmed, waitlisted, canceled
-    reason: Optional[str] = None
+from reservation_core import (
+    MODEL_ID,
+    MODEL_MAX_OUTPUT_TOKENS,
+    RESERVATION_ADAPTER,
+    RESERVATION_LIST_ADAPTER,
+    GuestProfile,
+    ReservationRequest,
+    ReservationStatus,
+    Table,
+    get_bedrock,
+    invoke_nova,
+    invoke_nova_many,
+    invoke_nova_stream,
+)
 
 # ---------- Mock Data ----------
+rng = np.random.default_rng()
+
+_table_seats = rng.choice([2, 4, 6], size=10)
+_table_types = rng.choice(["booth", "window", "standard"], size=10)
 mock_tables = [
-    Table(table_id=f"T{i}", seats=random.choice([2, 4, 6]), type=random.choice(["booth", "window", "standard"]))
-    for i in range(1, 11)
+    Table(table_id=f"T{i}", seats=int(seats), type=str(t_type))
+    for i, (seats, t_type) in enumerate(zip(_table_seats, _table_types), 1)
 ]
 
+# Pre-drawn uniforms for predict_no_show, consumed round-robin
+NOSHOW_BUF = rng.random(4096)
+_noshow_index = itertools.count()
+
+# Sorted once so the first fitting table is also the smallest one
+TABLES_BY_SEATS = sorted(mock_tables, key=lambda t: t.seats)
+
+# Struct-of-arrays view of the same tables for the JIT matcher
+TABLE_POSITIONS = {t.table_id: i for i, t in enumerate(TABLES_BY_SEATS)}
+TYPE_IDS: Dict[str, int] = {}
+TABLE_SEATS = np.array([t.seats for t in TABLES_BY_SEATS], dtype=np.int32)
+TABLE_TYPE_IDS = np.array(
+    [TYPE_IDS.setdefault(t.type, len(TYPE_IDS)) for t in TABLES_BY_SEATS], dtype=np.int32
+)
+# Bookings are tracked as one bit per table per 30-minute slot. Each booked day gets its own
+# packed uint8 matrix (one row per table in TABLES_BY_SEATS order), allocated on first use
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+RESERVED_BY_DAY: Dict[Date, np.ndarray] = {}
+_EMPTY_DAY = np.zeros((len(TABLES_BY_SEATS), (SLOTS_PER_DAY + 7) // 8), dtype=np.uint8)
+_EMPTY_DAY.setflags(write=False)
+
+def slot_of(date: str, time: str) -> Tuple[Date, int]:
+    try:
+        when = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        raise ValueError(
+            f"Invalid reservation date/time {date!r} {time!r}; expected YYYY-MM-DD and HH:MM"
+        ) from None
+    return when.date(), (when.hour * 60 + when.minute) // SLOT_MINUTES
+
+def day_bitmap(day: Date, create: bool = False) -> np.ndarray:
+    bitmap = RESERVED_BY_DAY.get(day)
+    if bitmap is None:
+        if not create:
+            return _EMPTY_DAY
+        bitmap = RESERVED_BY_DAY[day] = np.zeros_like(_EMPTY_DAY)
+    return bitmap
+
+def reserved_tables_mask(slot: Tuple[Date, int]) -> np.ndarray:
+    # One vectorised AND over the slot's byte column tests every table at once
+    day, index = slot
+    return (day_bitmap(day)[:, index >> 3] & (1 << (index & 7))) != 0
+
 mock_guest_profiles = {
     "G123": GuestProfile(
         guest_id="G123",
@@ -67,73 +100,158 @@ mock_guest_profiles = {
 mock_reservations = []
 mock_waitlist = []
 
-# ---------- AWS Bedrock Setup ----------
-AWS_REGION = os.getenv("AWS_REGION")
-MODEL_ID = "amazon.titan-text-premier-v1:0"
+# ---------- Prompts ----------
+# Static instructions are sent as the system prompt; only the guest's request varies per call.
+SYSTEM_PROMPT = """You are a hotel dining reservation agent. Your goal is to:
+- Understand reservation requests in natural language
+- Extract structured data needed for automated reservation systems
+- Fulfill guest preferences, improve seating utilization, manage waitlists
+
+Context:
+- Input may come from web, phone, app, or kiosk
+- Consider loyalty level, table type, no-show risk, and capacity
+
+Extract the following JSON from the request:
+{
+  "guest_id": "G123",
+  "party_size": int,
+  "date": "YYYY-MM-DD",
+  "time": "HH:MM",
+  "channel": "web",
+  "table_type": "window" | "booth" | "bar" | "standard" | "any"
+}
 
-if AWS_REGION and MODEL_ID:
-    bedrock = boto3.client("bedrock-runtime", region_name=AWS_REGION)
-else:
-    bedrock = None
-    print("⚠️ AWS credentials or model ID not configured. Nova model will be disabled.")
-
-def invoke_nova(prompt: str) -> str:
-    if not bedrock:
-        return "{}"  # Return mock empty JSON if Nova is not set up
-    body = {
-        "inputText": prompt,
-        "textGenerationConfig": {
-            "maxTokenCount": 500,
-            "stopSequences": [],
-            "temperature": 0.7,
-            "topP": 0.9
-        }
-    }
-    response = bedrock.invoke_model(
-        modelId=MODEL_ID,
-        contentType="application/json",
-        accept="application/json",
-        body=json.dumps(body)
-    )
-    result = json.loads(response["body"].read())
-    return result["results"][0]["outputText"]
+Assume default values if not specified: time='19:00', date='2025-07-15', table_type='any'"""
 
-# ---------- Agent Functions ----------
-def is_conflict(table: Table, date: str, time: str) -> bool:
-    return f"{date} {time}" in table.reserved_slots
+# Titan only accepts "|" and "User:" as stop sequences, so the closing-brace stop is skipped
+# there; tolerant_json_loads restores the brace when the model stops on it
+EXTRACTION_STOP = [] if MODEL_ID.startswith("amazon.titan") else ["}"]
+# A bare extracted object fits in 80 tokens. Without the brace stop the model may open with a
+# Markdown fence or a sentence of preamble, which needs headroom so the object isn't truncated.
+# Confirmations keep the 500 default.
+EXTRACTION_MAX_TOKENS = 80 if EXTRACTION_STOP else 160
+EXTRACTION_BATCH_SIZE = MODEL_MAX_OUTPUT_TOKENS // EXTRACTION_MAX_TOKENS
 
+# ---------- Agent Functions ----------
 def predict_no_show(guest_id: str) -> bool:
     guest = mock_guest_profiles.get(guest_id)
     if not guest:
         return False
-    return random.random() < 0.1  # 10% chance of no-show for demo
+    return bool(NOSHOW_BUF[next(_noshow_index) % len(NOSHOW_BUF)] < 0.1)  # 10% chance of no-show for demo
+
+def _find_table(party_size, type_mask, seats_arr, type_arr, reserved):
+    # Arrays are sorted by seats, so the first hit is the smallest table that fits
+    for i in range(seats_arr.shape[0]):
+        if seats_arr[i] >= party_size and type_mask[type_arr[i]] and not reserved[i]:
+            return i
+    return -1
+
+# Below this many tables, Numba's import and compile cost outweighs the scan it speeds up
+JIT_MIN_TABLES = 500
+
+@functools.lru_cache(maxsize=1)
+def jit_find_table():
+    try:
+        from numba import njit
+    except ImportError:
+        return None  # Numba is optional; table matching falls back to pure Python
+    return njit(cache=True)(_find_table)
+
+def match_table_jit(request: ReservationRequest, guest: Optional[GuestProfile],
+                    reserved: Optional[np.ndarray] = None) -> Optional[Table]:
+    type_mask = np.zeros(len(TYPE_IDS), dtype=np.bool_)
+    if request.table_type == "any":
+        type_mask[:] = True
+    elif request.table_type in TYPE_IDS:
+        type_mask[TYPE_IDS[request.table_type]] = True
+    else:
+        return None
+    if reserved is None:
+        reserved = reserved_tables_mask(slot_of(request.date, request.time))
+    find_table = jit_find_table() or _find_table
+
+    if guest and guest.loyalty_status == "Gold":
+        # Preferred types first, then any allowed type
+        preferred_mask = type_mask.copy()
+        for t_type, type_id in TYPE_IDS.items():
+            if t_type not in guest.preference_set:
+                preferred_mask[type_id] = False
+        i = find_table(request.party_size, preferred_mask, TABLE_SEATS, TABLE_TYPE_IDS, reserved)
+        if i >= 0:
+            return TABLES_BY_SEATS[i]
+    i = find_table(request.party_size, type_mask, TABLE_SEATS, TABLE_TYPE_IDS, reserved)
+    return TABLES_BY_SEATS[i] if i >= 0 else None
+
+@functools.lru_cache(maxsize=128)
+def tables_sorted_for_preferences(preference_set: FrozenSet[str]) -> List[Table]:
+    # Stable sort: preferred types first, each group still ordered by seats
+    return sorted(TABLES_BY_SEATS, key=lambda t: t.type not in preference_set)
+
+def match_table_python(request: ReservationRequest, guest: Optional[GuestProfile],
+                       reserved: Optional[np.ndarray] = None) -> Optional[Table]:
+    if guest and guest.loyalty_status == "Gold":
+        tables = tables_sorted_for_preferences(guest.preference_set)
+    else:
+        tables = TABLES_BY_SEATS
+    if reserved is None:
+        reserved = reserved_tables_mask(slot_of(request.date, request.time))
+    return next(
+        (
+            t for t in tables
+            if t.seats >= request.party_size and
+               (request.table_type == "any" or t.type == request.table_type) and
+               not reserved[TABLE_POSITIONS[t.table_id]]
+        ),
+        None
+    )
+
+def reserve_slot(table: Table, date: str, time: str):
+    day, index = slot_of(date, time)
+    table.is_available = False
+    day_bitmap(day, create=True)[TABLE_POSITIONS[table.table_id], index >> 3] |= 1 << (index & 7)
+
+if len(TABLES_BY_SEATS) >= JIT_MIN_TABLES and jit_find_table() is not None:
+    match_table = match_table_jit
+else:
+    match_table = match_table_python
+
+def is_gold(guest_id: str) -> bool:
+    guest = mock_guest_profiles.get(guest_id)
+    return bool(guest and guest.loyalty_status == "Gold")
 
 def autofill_waitlist():
     if not mock_waitlist:
         return
     print("🔄 Checking for autofill opportunities from waitlist...")
-    for request in mock_waitlist[:]:
-        status = table_optimization_agent(request)
-        if status.status == "confirmed":
-            print(f"✅ Waitlist guest {request.guest_id} promoted to reservation.")
-            mock_waitlist.remove(request)
+    # One pass per slot: availability is read once and entries are matched against it greedily
+    by_slot = defaultdict(list)
+    for position, request in enumerate(mock_waitlist):
+        by_slot[slot_of(request.date, request.time)].append((position, request))
+
+    promoted = set()
+    for slot, entries in by_slot.items():
+        reserved = reserved_tables_mask(slot)
+        if reserved.all():
+            continue  # Slot fully booked; nobody waiting on it can be seated
+        # Gold guests first, otherwise in the order they joined the waitlist
+        entries.sort(key=lambda entry: (not is_gold(entry[1].guest_id), entry[0]))
+        for position, request in entries:
+            table = match_table(request, mock_guest_profiles.get(request.guest_id), reserved)
+            if table:
+                reserve_slot(table, request.date, request.time)
+                reserved[TABLE_POSITIONS[table.table_id]] = True
+                promoted.add(position)
+                print(f"✅ Waitlist guest {request.guest_id} promoted to reservation.")
+
+    if promoted:
+        mock_waitlist[:] = [r for i, r in enumerate(mock_waitlist) if i not in promoted]
 
 def table_optimization_agent(request: ReservationRequest) -> ReservationStatus:
-    preferred_tables = [
-        t for t in mock_tables
-        if t.seats >= request.party_size and
-           (request.table_type == "any" or t.type == request.table_type) and
-           not is_conflict(t, request.date, request.time)
-    ]
-
     guest = mock_guest_profiles.get(request.guest_id)
-    if guest and guest.loyalty_status == "Gold":
-        preferred_tables.sort(key=lambda x: 0 if x.type in guest.preferences else 1)
+    table = match_table(request, guest)
 
-    if preferred_tables:
-        table = preferred_tables[0]
-        table.reserved_slots.append(f"{request.date} {request.time}")
-        table.is_available = False
+    if table:
+        reserve_slot(table, request.date, request.time)
         reservation_id = f"R{random.randint(1000,9999)}"
         return ReservationStatus(
             reservation_id=reservation_id,
@@ -171,38 +289,110 @@ def kitchen_alert_agent(status: ReservationStatus):
     if status.status == "confirmed":
         print(f"👨‍🍳 Kitchen notified of reservation {status.reservation_id} for guest {status.guest_id}.")
 
-def parse_natural_language_request(input_text: str) -> ReservationRequest:
-    prompt = f"""
-    You are a hotel dining reservation agent. Your goal is to:
-    - Understand reservation requests in natural language
-    - Extract structured data needed for automated reservation systems
-    - Fulfill guest preferences, improve seating utilization, manage waitlists
-
-    Context:
-    - Input may come from web, phone, app, or kiosk
-    - Consider loyalty level, table type, no-show risk, and capacity
-
-    Extract the following JSON from the request:
-    {{
-      "guest_id": "G123",
-      "party_size": int,
-      "date": "YYYY-MM-DD",
-      "time": "HH:MM",
-      "channel": "web",
-      "table_type": "window" | "booth" | "bar" | "standard" | "any"
-    }}
-
-    Assume default values if not specified: time='19:00', date='2025-07-15', table_type='any'
-    Request: "{input_text}"
-    """
-    response = invoke_nova(prompt)
+def build_extraction_prompt(input_text: str) -> str:
+    return f'Request: "{input_text}"'
+
+_JSON_DECODER = json.JSONDecoder()
+
+def tolerant_json_loads(text: str, opener: str = "{"):
+    # Recover a JSON object (opener "{") or array (opener "[") from typical LLM noise:
+    # Markdown fences, surrounding prose, or a closing bracket eaten by a stop sequence
+    text = re.sub(r"```(?:json)?", "", text).strip()
+    start = text.find(opener)
+    if start == -1:
+        return json.loads(text)
+    closer = "}" if opener == "{" else "]"
     try:
-        data = json.loads(response)
-        return ReservationRequest(**data)
+        # Decodes just the value at start, so braces in trailing prose don't matter
+        return _JSON_DECODER.raw_decode(text, start)[0]
+    except ValueError:
+        if closer in text[start:]:
+            raise
+        return json.loads(text[start:] + closer)
+
+def parse_nova_reservation(response: str) -> ReservationRequest:
+    try:
+        return RESERVATION_ADAPTER.validate_json(response)
+    except ValidationError:
+        pass
+    try:
+        return RESERVATION_ADAPTER.validate_python(tolerant_json_loads(response))
     except Exception as e:
         print("❌ Failed to parse response from Nova:", response)
         raise e
 
+def normalize_request_text(input_text: str) -> str:
+    # Only used as a cache key; the model always sees the guest's original wording.
+    # "." and "," stay so "7.30" and "2,4" don't collide with "730" and "24".
+    text = re.sub(r"[^\w\s:/.,-]", "", input_text.lower())
+    return " ".join(text.split())
+
+# Parsed requests keyed by normalized text, least recently used first. Failed parses raise
+# and are never stored; defaults in SYSTEM_PROMPT are fixed, so entries don't go stale.
+PARSE_CACHE_SIZE = 2048
+_parse_cache: "OrderedDict[str, ReservationRequest]" = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+def _parse_uncached(input_text: str) -> ReservationRequest:
+    response = invoke_nova_stream(
+        build_extraction_prompt(input_text),
+        system=SYSTEM_PROMPT,
+        stop_at_json=True,
+        stop=EXTRACTION_STOP,
+        max_tokens=EXTRACTION_MAX_TOKENS
+    )
+    return parse_nova_reservation(response)
+
+def parse_natural_language_request(input_text: str) -> ReservationRequest:
+    key = normalize_request_text(input_text)
+    with _parse_cache_lock:
+        request = _parse_cache.get(key)
+        if request is not None:
+            _parse_cache.move_to_end(key)
+    if request is None:
+        request = _parse_uncached(input_text)
+        with _parse_cache_lock:
+            _parse_cache[key] = request
+            if len(_parse_cache) > PARSE_CACHE_SIZE:
+                _parse_cache.popitem(last=False)
+    # Copy so callers can't mutate the cached instance
+    return request.model_copy()
+
+def _parse_batch_chunk(texts: List[str]) -> List[ReservationRequest]:
+    numbered = "\n".join(f'{i}. "{text}"' for i, text in enumerate(texts, 1))
+    prompt = (
+        "Return a JSON array with one such object per request, in the same order."
+        + f"\nRequests:\n{numbered}"
+    )
+    # Only format failures fall back; throttling and other client errors propagate
+    rejected = (ValidationError, ValueError)
+    bedrock = get_bedrock()
+    if bedrock:
+        rejected += (bedrock.exceptions.ValidationException,)
+    try:
+        response = invoke_nova(prompt, system=SYSTEM_PROMPT, max_tokens=EXTRACTION_MAX_TOKENS * len(texts))
+        requests = RESERVATION_LIST_ADAPTER.validate_python(tolerant_json_loads(response, "["))
+        if len(requests) == len(texts):
+            return requests
+    except rejected:
+        pass
+    # Model rejected the call or didn't honour the multi-item format; fall back to one call per request in parallel
+    print("⚠️ Batched parse failed, parsing requests individually.")
+    responses = invoke_nova_many(
+        [build_extraction_prompt(text) for text in texts],
+        system=SYSTEM_PROMPT,
+        stop=EXTRACTION_STOP,
+        max_tokens=EXTRACTION_MAX_TOKENS
+    )
+    return [parse_nova_reservation(r) for r in responses]
+
+def parse_natural_language_requests_batch(texts: List[str]) -> List[ReservationRequest]:
+    # Chunked so each batched reply fits within the model's output token limit
+    requests = []
+    for start in range(0, len(texts), EXTRACTION_BATCH_SIZE):
+        requests.extend(_parse_batch_chunk(texts[start:start + EXTRACTION_BATCH_SIZE]))
+    return requests
+
 # ---------- Main ----------
 if __name__ == "__main__":
     print("\n🛎️ Welcome to the Hotel Dining Reservation Assistant!")
@@ -0,0 +1,207 @@
+# reservation_core.py
+# Shared models and Bedrock access for the dine-in reservation scripts
+
+import functools
+from functools import cached_property
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import FrozenSet, List, Optional
+
+try:
+    from dotenv import load_dotenv
+    from pydantic import BaseModel, TypeAdapter, field_validator
+except ImportError as e:
+    print("\n🔧 Required packages not found. Please install dependencies with:")
+    print("pip install boto3 python-dotenv pydantic")
+    raise e
+
+# Load environment variables; skip the .env lookup when the environment is already configured
+if os.getenv("AWS_REGION") is None:
+    load_dotenv()
+
+# ---------- Context Models ----------
+class GuestProfile(BaseModel):
+    guest_id: str
+    name: str
+    loyalty_status: str
+    preferences: List[str]
+    visit_history: List[str]
+
+    # Ordered list stays for display; hot-path membership tests use this set
+    @cached_property
+    def preference_set(self) -> FrozenSet[str]:
+        return frozenset(self.preferences)
+
+class ReservationRequest(BaseModel):
+    guest_id: str
+    party_size: int
+    date: str
+    time: str
+    channel: str  # web, phone, kiosk, app
+    table_type: Optional[str] = "any"
+
+    # Nova sometimes answers "7:30 PM" or "July 15"; reject those at parse time so they are
+    # never cached or handed to slot_of
+    @field_validator("date")
+    @classmethod
+    def check_date(cls, value: str) -> str:
+        datetime.strptime(value, "%Y-%m-%d")
+        return value
+
+    @field_validator("time")
+    @classmethod
+    def check_time(cls, value: str) -> str:
+        datetime.strptime(value, "%H:%M")
+        return value
+
+class Table(BaseModel):
+    table_id: str
+    seats: int
+    type: str  # window, booth, bar, etc.
+    is_available: bool = True
+
+class ReservationStatus(BaseModel):
+    reservation_id: str
+    guest_id: str
+    table_id: Optional[str]
+    status: str  # confirmed, waitlisted, canceled
+    reason: Optional[str] = None
+
+# Built once so hot paths validate Nova's raw JSON text directly in pydantic-core
+RESERVATION_ADAPTER = TypeAdapter(ReservationRequest)
+RESERVATION_LIST_ADAPTER = TypeAdapter(List[ReservationRequest])
+
+# ---------- AWS Bedrock Setup ----------
+AWS_REGION = os.getenv("AWS_REGION")
+MODEL_ID = "amazon.titan-text-premier-v1:0"
+MODEL_MAX_OUTPUT_TOKENS = 3072  # Titan Text Premier's per-response limit
+
+# Models that accept Bedrock's latency-optimized inference tier
+LATENCY_OPTIMIZED_MODELS = {
+    "us.amazon.nova-pro-v1:0",
+    "us.anthropic.claude-3-5-haiku-20241022-v1:0",
+    "us.meta.llama3-1-70b-instruct-v1:0",
+    "us.meta.llama3-1-405b-instruct-v1:0",
+}
+# Narrowed at runtime when Bedrock rejects the tier for this region, so the retry is paid once per process
+_latency_optimized_models = set(LATENCY_OPTIMIZED_MODELS)
+_latency_optimized_lock = threading.Lock()
+
+if not (AWS_REGION and MODEL_ID):
+    print("⚠️ AWS credentials or model ID not configured. Nova model will be disabled.")
+
+# boto3 is imported and the client built on first use, keeping both off the CLI's startup path
+_bedrock = None
+_bedrock_lock = threading.Lock()
+
+def get_bedrock():
+    global _bedrock
+    if _bedrock is None and AWS_REGION and MODEL_ID:
+        with _bedrock_lock:
+            if _bedrock is None:
+                import boto3
+                from botocore.config import Config
+                _bedrock = boto3.client(
+                    "bedrock-runtime",
+                    region_name=AWS_REGION,
+                    config=Config(
+                        max_pool_connections=32,
+                        retries={"max_attempts": 2, "mode": "adaptive"},
+                        tcp_keepalive=True
+                    )
+                )
+    return _bedrock
+
+# Titan models reject Converse's system field, so their system prompt is sent as a message prefix
+SYSTEM_FIELD_UNSUPPORTED = MODEL_ID.startswith("amazon.titan")
+
+_INFERENCE_CONFIG = {
+    "maxTokens": 500,
+    "stopSequences": [],
+    "temperature": 0.7,
+    "topP": 0.9
+}
+
+# Only a handful of (stop, max_tokens) combinations are ever used, so each config dict is built once
+@functools.lru_cache(maxsize=32)
+def _inference_config(stop: tuple, max_tokens: int) -> dict:
+    return {**_INFERENCE_CONFIG, "maxTokens": max_tokens, "stopSequences": list(stop)}
+
+def send_nova_request(bedrock, operation_name: str, prompt: str, system: Optional[str] = None,
+                      latency_optimized: bool = True, stop: Optional[List[str]] = None,
+                      max_tokens: int = 500):
+    kwargs = {
+        "modelId": MODEL_ID,
+        "inferenceConfig": _inference_config(tuple(stop or ()), max_tokens)
+    }
+    if system and SYSTEM_FIELD_UNSUPPORTED:
+        prompt = system + "\n" + prompt
+    elif system:
+        kwargs["system"] = [{"text": system}]
+    kwargs["messages"] = [{"role": "user", "content": [{"text": prompt}]}]
+    operation = getattr(bedrock, operation_name)
+    if latency_optimized and MODEL_ID in _latency_optimized_models:
+        try:
+            return operation(performanceConfig={"latency": "optimized"}, **kwargs)
+        except bedrock.exceptions.ValidationException as e:
+            if "latency" not in str(e).lower():
+                raise
+            # Optimized tier not offered for this model/region; remember that and use the standard one
+            with _latency_optimized_lock:
+                _latency_optimized_models.discard(MODEL_ID)
+            return operation(**kwargs)
+    return operation(**kwargs)
+
+def invoke_nova(prompt: str, system: Optional[str] = None, latency_optimized: bool = True,
+                stop: Optional[List[str]] = None, max_tokens: int = 500) -> str:
+    bedrock = get_bedrock()
+    if not bedrock:
+        return "{}"  # Return mock empty JSON if Nova is not set up
+    response = send_nova_request(bedrock, "converse", prompt, system, latency_optimized, stop, max_tokens)
+    return response["output"]["message"]["content"][0]["text"]
+
+def invoke_nova_stream(prompt: str, system: Optional[str] = None, on_text=None,
+                       stop_at_json: bool = False, latency_optimized: bool = True,
+                       stop: Optional[List[str]] = None, max_tokens: int = 500) -> str:
+    # Streams the completion; on_text gets each piece as it arrives. With stop_at_json the
+    # stream is cut as soon as a complete JSON object has been generated and only that object is returned.
+    bedrock = get_bedrock()
+    if not bedrock:
+        return "{}"  # Return mock empty JSON if Nova is not set up
+    response = send_nova_request(
+        bedrock, "converse_stream", prompt, system, latency_optimized, stop, max_tokens
+    )
+    stream = response["stream"]
+    decoder = json.JSONDecoder()
+    pieces = []
+    try:
+        for event in stream:
+            piece = event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+            if not piece:
+                continue
+            pieces.append(piece)
+            if on_text:
+                on_text(piece)
+            if stop_at_json and "}" in piece:
+                text = "".join(pieces)
+                start = text.find("{")
+                if start == -1:
+                    continue
+                try:
+                    _, end = decoder.raw_decode(text, start)
+                except ValueError:
+                    continue  # Object not closed yet
+                return text[start:end]
+    finally:
+        stream.close()
+    return "".join(pieces)
+
+def invoke_nova_many(prompts: List[str], **kwargs) -> List[str]:
+    # Calls are I/O bound, so threads overlap the network waits over the shared connection pool
+    if len(prompts) <= 1:
+        return [invoke_nova(p, **kwargs) for p in prompts]
+    with ThreadPoolExecutor(max_workers=min(16, len(prompts))) as pool:
+        return list(pool.map(lambda p: invoke_nova(p, **kwargs), prompts))
@@ -1,27 +1,8 @@
-import boto3
-import json
-from dotenv import load_dotenv
-import os
+import sys
 
-load_dotenv()
-bedrock = boto3.client("bedrock-runtime", region_name=os.getenv("AWS_REGION"))
+from reservation_core import get_bedrock, invoke_nova
 
-prompt = {
-    "inputText": "Write a welcoming message to a hotel guest.",
-    "textGenerationConfig": {
-        "maxTokenCount": 200,
-        "temperature": 0.7,
-        "topP": 0.9,
-        "stopSequences": []
-    }
-}
+if get_bedrock() is None:
+    sys.exit("❌ Bedrock client not configured. Set AWS_REGION and credentials in .env.")
 
-response = bedrock.invoke_model(
-    modelId="amazon.titan-text-premier-v1:0",
-    contentType="application/json",
-    accept="application/json",
-    body=json.dumps(prompt)
-)
-
-output = json.loads(response['body'].read())
-print(output["results"][0]["outputText"])
+print(invoke_nova("Write a welcoming message to a hotel guest.", max_tokens=200))
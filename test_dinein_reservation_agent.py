@@ -0,0 +1,278 @@
+import json
+import random
+import re
+
+import pytest
+from pydantic import ValidationError
+
+import dinein_reservation_agent as agent
+
+DATE = "2025-07-15"
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    agent.RESERVED_BY_DAY.clear()
+    agent.mock_waitlist.clear()
+    yield
+    agent.RESERVED_BY_DAY.clear()
+    agent.mock_waitlist.clear()
+
+
+def make_request(guest_id="X", party_size=1, time="19:00", table_type="any", date=DATE):
+    return agent.ReservationRequest(
+        guest_id=guest_id,
+        party_size=party_size,
+        date=date,
+        time=time,
+        channel="web",
+        table_type=table_type,
+    )
+
+
+def free_table(table, date, time):
+    day, index = agent.slot_of(date, time)
+    agent.RESERVED_BY_DAY[day][agent.TABLE_POSITIONS[table.table_id], index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+
+# ---------- Slots ----------
+@pytest.mark.parametrize("time, index", [
+    ("00:00", 0),
+    ("00:29", 0),
+    ("00:30", 1),
+    ("19:00", 38),
+    ("19:15", 38),
+    ("23:59", 47),
+])
+def test_slot_of_maps_times_to_half_hour_slots(time, index):
+    day, slot_index = agent.slot_of(DATE, time)
+    assert str(day) == DATE
+    assert slot_index == index
+
+
+@pytest.mark.parametrize("date, time", [
+    (DATE, "24:00"),
+    (DATE, "-1:00"),
+    (DATE, "19:60"),
+    (DATE, "19:00:00"),
+    (DATE, "7:30 PM"),
+    ("2025-02-30", "19:00"),
+])
+def test_slot_of_rejects_invalid_date_or_time(date, time):
+    with pytest.raises(ValueError, match="expected YYYY-MM-DD and HH:MM"):
+        agent.slot_of(date, time)
+
+
+def test_reservation_only_blocks_its_own_slot():
+    table = agent.TABLES_BY_SEATS[0]
+    agent.reserve_slot(table, "2040-12-31", "23:30")
+    position = agent.TABLE_POSITIONS[table.table_id]
+
+    assert agent.reserved_tables_mask(agent.slot_of("2040-12-31", "23:45"))[position]
+    assert not agent.reserved_tables_mask(agent.slot_of("2040-12-31", "23:00"))[position]
+    assert not agent.reserved_tables_mask(agent.slot_of("2041-01-01", "00:00"))[position]
+
+
+# ---------- Reservations and waitlist ----------
+def test_full_slot_waitlists_request():
+    for table in agent.mock_tables:
+        agent.reserve_slot(table, DATE, "19:00")
+
+    status = agent.table_optimization_agent(make_request())
+
+    assert status.status == "waitlisted"
+    assert agent.mock_waitlist == [make_request()]
+
+
+def test_autofill_promotes_gold_guest_first_and_keeps_unmatched_once():
+    for table in agent.mock_tables:
+        agent.reserve_slot(table, DATE, "19:00")
+    regular = make_request(guest_id="X")
+    gold = make_request(guest_id="G123")
+    agent.table_optimization_agent(regular)
+    agent.table_optimization_agent(gold)
+
+    free_table(agent.TABLES_BY_SEATS[-1], DATE, "19:00")
+    agent.autofill_waitlist()
+
+    assert agent.mock_waitlist == [regular]
+
+
+def test_autofill_skips_fully_booked_slot():
+    for table in agent.mock_tables:
+        agent.reserve_slot(table, DATE, "19:00")
+    agent.table_optimization_agent(make_request())
+
+    agent.autofill_waitlist()
+
+    assert agent.mock_waitlist == [make_request()]
+
+
+# ---------- Matchers ----------
+def test_jit_and_python_matchers_agree():
+    rnd = random.Random(0)
+    for _ in range(500):
+        request = make_request(
+            guest_id=rnd.choice(["G123", "X"]),
+            party_size=rnd.randint(1, 7),
+            time=rnd.choice(["18:00", "19:00", "20:30"]),
+            table_type=rnd.choice(["any", "booth", "window", "standard", "bar"]),
+        )
+        guest = agent.mock_guest_profiles.get(request.guest_id)
+
+        jit_table = agent.match_table_jit(request, guest)
+        python_table = agent.match_table_python(request, guest)
+
+        assert (jit_table and jit_table.table_id) == (python_table and python_table.table_id)
+        if jit_table:
+            agent.reserve_slot(jit_table, request.date, request.time)
+
+
+# ---------- JSON recovery ----------
+@pytest.mark.parametrize("text, opener, expected", [
+    ('{"a": 1}', "{", {"a": 1}),
+    ('```json\n{"a": 1}\n```', "{", {"a": 1}),
+    ('note [x] {"a": 1} thanks', "{", {"a": 1}),
+    ('Here: {"guest_id": "G1"} (use {} for blanks)', "{", {"guest_id": "G1"}),
+    ('{"a": 1', "{", {"a": 1}),
+    ('Here you go: [{"a": 1}]', "[", [{"a": 1}]),
+    ('[{"a": 1}', "[", [{"a": 1}]),
+])
+def test_tolerant_json_loads(text, opener, expected):
+    assert agent.tolerant_json_loads(text, opener) == expected
+
+
+# ---------- Batched parsing ----------
+def reservation_json(guest_id):
+    return json.dumps({"guest_id": guest_id, "party_size": 2, "date": DATE, "time": "19:00", "channel": "web"})
+
+
+class FakeNova:
+    """Answers batched prompts with one object per numbered request, echoing the text as guest_id."""
+
+    def __init__(self, drop=0):
+        self.drop = drop
+        self.batches = []
+        self.singles = []
+
+    def invoke_nova(self, prompt, **kwargs):
+        texts = re.findall(r'^\d+\. "(.*)"$', prompt, re.M)
+        self.batches.append(texts)
+        return "[" + ", ".join(reservation_json(text) for text in texts[self.drop:]) + "]"
+
+    def invoke_nova_many(self, prompts, **kwargs):
+        self.singles.extend(prompts)
+        return [reservation_json(re.search(r'"(.*)"', prompt).group(1)) for prompt in prompts]
+
+
+@pytest.fixture
+def fake_nova(monkeypatch):
+    nova = FakeNova()
+    monkeypatch.setattr(agent, "invoke_nova", nova.invoke_nova)
+    monkeypatch.setattr(agent, "invoke_nova_many", nova.invoke_nova_many)
+    return nova
+
+
+def test_batch_is_chunked_to_batch_size(fake_nova, monkeypatch):
+    monkeypatch.setattr(agent, "EXTRACTION_BATCH_SIZE", 2)
+    texts = ["a", "b", "c", "d", "e"]
+
+    requests = agent.parse_natural_language_requests_batch(texts)
+
+    assert [r.guest_id for r in requests] == texts
+    assert fake_nova.batches == [["a", "b"], ["c", "d"], ["e"]]
+    assert fake_nova.singles == []
+
+
+def test_batch_length_mismatch_falls_back_to_single_calls(fake_nova):
+    fake_nova.drop = 1
+
+    requests = agent.parse_natural_language_requests_batch(["a", "b"])
+
+    assert [r.guest_id for r in requests] == ["a", "b"]
+    assert len(fake_nova.singles) == 2
+
+
+def test_batch_client_errors_propagate(fake_nova, monkeypatch):
+    def throttled(prompt, **kwargs):
+        raise RuntimeError("ThrottlingException")
+    monkeypatch.setattr(agent, "invoke_nova", throttled)
+
+    with pytest.raises(RuntimeError):
+        agent.parse_natural_language_requests_batch(["a"])
+    assert fake_nova.singles == []
+
+
+def test_empty_batch_makes_no_calls(fake_nova):
+    assert agent.parse_natural_language_requests_batch([]) == []
+    assert fake_nova.batches == [] and fake_nova.singles == []
+
+
+# ---------- Parse cache ----------
+@pytest.fixture
+def nova_replies(monkeypatch):
+    agent._parse_cache.clear()
+    prompts = []
+
+    def install(reply):
+        def stream(prompt, **kwargs):
+            prompts.append(prompt)
+            return reply
+        monkeypatch.setattr(agent, "invoke_nova_stream", stream)
+        return prompts
+    yield install
+    agent._parse_cache.clear()
+
+
+def test_reply_with_unparseable_time_is_rejected_and_not_cached(nova_replies):
+    nova_replies(reservation_json("G1").replace("19:00", "7:30 PM"))
+
+    with pytest.raises(ValidationError):
+        agent.parse_natural_language_request("table for 2 at 7:30 PM")
+
+    assert not agent._parse_cache
+
+
+def test_cache_hit_ignores_case_and_spacing(nova_replies):
+    prompts = nova_replies(reservation_json("G1"))
+
+    first = agent.parse_natural_language_request("Table for 2  at 7pm!")
+    second = agent.parse_natural_language_request("table for 2 at 7PM")
+
+    assert first == second
+    assert len(prompts) == 1
+    assert "Table for 2  at 7pm!" in prompts[0]
+
+
+@pytest.mark.parametrize("first, second", [
+    ("party of 2 at 7.30", "party of 2 at 730"),
+    ("tables for 2,4", "tables for 24"),
+])
+def test_cache_keeps_separators_that_change_meaning(nova_replies, first, second):
+    prompts = nova_replies(reservation_json("G1"))
+
+    agent.parse_natural_language_request(first)
+    agent.parse_natural_language_request(second)
+
+    assert len(prompts) == 2
+
+
+def test_cache_evicts_least_recently_used(nova_replies, monkeypatch):
+    monkeypatch.setattr(agent, "PARSE_CACHE_SIZE", 2)
+    prompts = nova_replies(reservation_json("G1"))
+
+    for text in ["a", "b", "a", "c"]:
+        agent.parse_natural_language_request(text)
+    assert len(prompts) == 3
+    assert list(agent._parse_cache) == ["a", "c"]
+
+    agent.parse_natural_language_request("b")
+    assert len(prompts) == 4
+
+
+def test_cache_returns_isolated_copies(nova_replies):
+    nova_replies(reservation_json("G1"))
+
+    agent.parse_natural_language_request("table for 2").party_size = 99
+
+    assert agent.parse_natural_language_request("table for 2").party_size == 2
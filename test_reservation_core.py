@@ -0,0 +1,107 @@
+import pytest
+
+import reservation_core as core
+
+OPTIMIZED_MODEL = "us.amazon.nova-pro-v1:0"
+
+
+class ValidationException(Exception):
+    pass
+
+
+class FakeBedrock:
+    """Records Converse calls and rejects the latency-optimized tier with the given message."""
+
+    def __init__(self, rejection=None):
+        self.exceptions = type("Exceptions", (), {"ValidationException": ValidationException})
+        self.rejection = rejection
+        self.calls = []
+
+    def converse(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.rejection and "performanceConfig" in kwargs:
+            raise ValidationException(self.rejection)
+        return {"output": {"message": {"content": [{"text": "ok"}]}}}
+
+
+@pytest.fixture
+def optimized_model(monkeypatch):
+    monkeypatch.setattr(core, "MODEL_ID", OPTIMIZED_MODEL)
+    monkeypatch.setattr(core, "_latency_optimized_models", set(core.LATENCY_OPTIMIZED_MODELS))
+
+
+# ---------- Latency-optimized inference ----------
+def test_rejected_latency_tier_is_retried_once_per_process(optimized_model):
+    bedrock = FakeBedrock("Latency optimized inference is not supported for this model in this region")
+
+    for _ in range(3):
+        core.send_nova_request(bedrock, "converse", "hi")
+
+    assert ["performanceConfig" in call for call in bedrock.calls] == [True, False, False, False]
+    assert OPTIMIZED_MODEL not in core._latency_optimized_models
+
+
+def test_unrelated_validation_error_is_not_retried(optimized_model):
+    bedrock = FakeBedrock("Input is too long for requested model")
+
+    with pytest.raises(ValidationException):
+        core.send_nova_request(bedrock, "converse", "hi")
+
+    assert len(bedrock.calls) == 1
+    assert OPTIMIZED_MODEL in core._latency_optimized_models
+
+
+# ---------- Streaming ----------
+class FakeStream:
+    def __init__(self, pieces):
+        self.events = [{"messageStart": {"role": "assistant"}}]
+        self.events += [{"contentBlockDelta": {"delta": {"text": piece}}} for piece in pieces]
+        self.events.append({"messageStop": {"stopReason": "stop_sequence"}})
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for event in self.events:
+            self.consumed += 1
+            yield event
+
+    def close(self):
+        self.closed = True
+
+
+class FakeStreamingBedrock:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def converse_stream(self, **kwargs):
+        return {"stream": self.stream}
+
+
+@pytest.fixture
+def stream_of(monkeypatch):
+    def install(pieces):
+        stream = FakeStream(pieces)
+        monkeypatch.setattr(core, "get_bedrock", lambda: FakeStreamingBedrock(stream))
+        return stream
+    return install
+
+
+def test_stream_stops_at_first_complete_json_object(stream_of):
+    stream = stream_of(['Sure: {"a": ', '{"b": 1}', ', "c": 2}', " and more", " text"])
+    seen = []
+
+    text = core.invoke_nova_stream("hi", on_text=seen.append, stop_at_json=True)
+
+    assert text == '{"a": {"b": 1}, "c": 2}'
+    assert seen == ['Sure: {"a": ', '{"b": 1}', ', "c": 2}']
+    assert stream.closed
+    assert stream.consumed < len(stream.events)
+
+
+def test_stream_returns_all_text_when_stop_sequence_eats_the_brace(stream_of):
+    stream = stream_of(['{"a": 1', ', "b": 2'])
+
+    text = core.invoke_nova_stream("hi", stop_at_json=True, stop=["}"])
+
+    assert text == '{"a": 1, "b": 2'
+    assert stream.closed